@@ -1,27 +1,25 @@
+import sqlite3
 import streamlit as st
 import pandas as pd
+import numpy as np
 from contextlib import contextmanager
-from db import get_conn, get_columns
-from utils import log_action, hash_password
+from db import get_columns, pooled_conn
+from utils import log_action, warn_db_error, render_open_tab, hash_password, get_full_data_details, utcnow
 from datetime import datetime, timedelta
 import io, csv, json
 
 @contextmanager
 def db_connection():
-    conn = None
-    try:
-        conn = get_conn()
+    with pooled_conn() as conn:
         yield conn
-    finally:
-        if conn:
-            conn.close()
 
 def safe_dataframe(rows, table: str):
     try:
         if rows:
-            return pd.DataFrame(rows, columns=rows[0].keys())
-        cols = get_columns(table)
-        return pd.DataFrame([], columns=cols)
+            # Columns come from the query, which may project a subset of the table
+            return pd.DataFrame.from_records([tuple(r) for r in rows], columns=rows[0].keys())
+        # get_columns is cached per table, so empty results cost no PRAGMA
+        return pd.DataFrame([], columns=get_columns(table))
     except Exception:
         return pd.DataFrame([])
 
@@ -42,22 +40,19 @@ STATUS_BADGES = {
     'in_extraction': '🔴 In Extraction',
 }
 
+def _build_style_matrix(df):
+    """CSS for every cell, looked up per row from the status column"""
+    css = df['status'].map({k: f'background-color: {v["bg"]}; color: {v["text"]}' for k, v in STATUS_COLORS.items()})
+    css = css.fillna('background-color: white; color: black').to_numpy(dtype=object)
+    return pd.DataFrame(np.broadcast_to(css[:, None], df.shape), index=df.index, columns=df.columns)
+
 def style_status_dataframe(df):
     """Apply color styling to dataframe based on status column"""
     if df.empty or 'status' not in df.columns:
         return df
-    
-    def highlight_row(row):
-        status = row.get('status', '')
-        colors = STATUS_COLORS.get(status, {'bg': 'white', 'text': 'black'})
-        return [f'background-color: {colors["bg"]}; color: {colors["text"]}'] * len(row)
-    
-    styled = df.style.apply(highlight_row, axis=1)
-    return styled
+    return df.style.apply(_build_style_matrix, axis=None)
 
-def render_status_legend():
-    """Render status color legend"""
-    st.markdown("""
+_LEGEND_HTML = """
     <div style="display: flex; gap: 15px; flex-wrap: wrap; margin-bottom: 10px; padding: 10px; background: #f8f9fa; border-radius: 8px;">
         <span style="padding: 4px 10px; background: #d4edda; color: #155724; border-radius: 4px; font-size: 12px;">🟢 Available</span>
         <span style="padding: 4px 10px; background: #fff3cd; color: #856404; border-radius: 4px; font-size: 12px;">🟡 Issued</span>
@@ -65,7 +60,11 @@ def render_status_legend():
         <span style="padding: 4px 10px; background: #e2e3e5; color: #383d41; border-radius: 4px; font-size: 12px;">⚪ Returned</span>
         <span style="padding: 4px 10px; background: #f8d7da; color: #721c24; border-radius: 4px; font-size: 12px;">🔴 In Extraction</span>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+def render_status_legend():
+    """Render status color legend"""
+    st.markdown(_LEGEND_HTML, unsafe_allow_html=True)
 
 # Default options (used if DB empty)
 DEFAULT_UNITS = ["4(1) Delhi", "4(2) Mumbai", "4(3) Kolkata", "4(4) Chennai", 
@@ -80,9 +79,9 @@ def get_options(option_type):
             c.execute("SELECT name FROM options WHERE type=? ORDER BY name", (option_type,))
             rows = c.fetchall()
             if rows:
-                return [r['name'] for r in rows]
-    except:
-        pass
+                return [name for name, in rows]
+    except sqlite3.Error as e:
+        warn_db_error(e)
     return DEFAULT_UNITS if option_type == 'unit' else DEFAULT_VENDORS
 
 def get_users_with_hdd():
@@ -94,38 +93,30 @@ def get_users_with_hdd():
                 SELECT DISTINCT team_code FROM hdd_records 
                 WHERE team_code IS NOT NULL AND team_code != '' AND status='issued'
             """).fetchall()
-            return {a['team_code'] for a in assigned}
-    except:
+            return {team_code for team_code, in assigned}
+    except sqlite3.Error as e:
+        warn_db_error(e)
         return set()
 
 def format_user_list_with_hdd_status(users, include_not_assigned=False):
-    """Format user list with color indicators for HDD assignment status"""
+    """Map each username to a label with a color indicator for HDD assignment status"""
     users_with_hdd = get_users_with_hdd()
     
-    user_list = []
+    user_labels = {}
     if include_not_assigned:
-        user_list.append("-- Not Assigned --")
+        user_labels[None] = "-- Not Assigned --"
     
-    for u in users:
-        uname = u['username']
+    for uname, in users:
         if uname in users_with_hdd:
-            user_list.append(f"🔴 {uname} (has HDD)")
+            user_labels[uname] = f"🔴 {uname} (has HDD)"
         else:
-            user_list.append(f"🟢 {uname}")
+            user_labels[uname] = f"🟢 {uname}"
     
-    return user_list
-
-def extract_username_from_selection(selection):
-    """Extract actual username from formatted selection string"""
-    if selection in ["-- Not Assigned --", ""]:
-        return None
-    # Remove emoji and status indicator
-    if selection.startswith("🔴 ") or selection.startswith("🟢 "):
-        uname = selection[2:].strip()  # Remove emoji
-        if " (has HDD)" in uname:
-            uname = uname.replace(" (has HDD)", "")
-        return uname
-    return selection
+    return user_labels
+
+def labeled_selectbox(label, labels, empty="", **kwargs):
+    """Selectbox whose values are the keys of labels, shown by their label; `empty` stands in when there are none"""
+    return st.selectbox(label, list(labels) or [empty], format_func=lambda k: labels.get(k, k), **kwargs)
 
 def render_settings_tab(user):
     """Manage Units and Vendors lists"""
@@ -141,7 +132,8 @@ def render_settings_tab(user):
             with db_connection() as conn:
                 c = conn.cursor()
                 units = c.execute("SELECT id, name FROM options WHERE type='unit' ORDER BY name").fetchall()
-        except:
+        except sqlite3.Error as e:
+            warn_db_error(e, user)
             units = []
         
         if units:
@@ -197,7 +189,8 @@ def render_settings_tab(user):
             with db_connection() as conn:
                 c = conn.cursor()
                 vendors = c.execute("SELECT id, name FROM options WHERE type='vendor' ORDER BY name").fetchall()
-        except:
+        except sqlite3.Error as e:
+            warn_db_error(e, user)
             vendors = []
         
         if vendors:
@@ -265,11 +258,12 @@ def render_add_assign_hdd_tab(user):
                     with db_connection() as conn:
                         c = conn.cursor()
                         users = c.execute("SELECT username FROM users WHERE role='user' AND approved=1").fetchall()
-                        user_list = format_user_list_with_hdd_status(users, include_not_assigned=True)
-                except:
-                    user_list = ["-- Not Assigned --"]
+                        user_labels = format_user_list_with_hdd_status(users, include_not_assigned=True)
+                except sqlite3.Error as e:
+                    warn_db_error(e, user)
+                    user_labels = {None: "-- Not Assigned --"}
                 
-                assign_to = st.selectbox("Assign to User (Optional)", user_list, label_visibility="visible")
+                assign_to = labeled_selectbox("Assign to User (Optional)", user_labels, label_visibility="visible")
                 st.caption("🟢 = Available | 🔴 = Already has HDD")
             
             if st.form_submit_button("💾 Add HDD", use_container_width=True):
@@ -292,10 +286,10 @@ def render_add_assign_hdd_tab(user):
                                     status_info += f", Assigned to: {existing['team_code']}"
                                 st.error(f"❌ Serial No '{serial_no}' already exists in the system! ({status_info})")
                             else:
-                                now = datetime.utcnow().isoformat()
+                                now = utcnow().isoformat()
 
-                                # Determine if assigned - extract actual username
-                                team_code = extract_username_from_selection(assign_to)
+                                # The selectbox value is the username, or None when not assigned
+                                team_code = assign_to
                                 status = "issued" if team_code else "available"
 
                                 c.execute("""
@@ -328,11 +322,12 @@ def render_add_assign_hdd_tab(user):
                             SELECT serial_no, unit_space FROM hdd_records 
                             WHERE team_code IS NULL OR team_code = ''
                         """).fetchall()
-                        hdd_list = [f"{h['serial_no']} - {h['unit_space']}" for h in hdds]
-                except:
-                    hdd_list = []
+                        hdd_labels = {sn: f"{sn} - {us}" for sn, us in hdds}
+                except sqlite3.Error as e:
+                    warn_db_error(e, user)
+                    hdd_labels = {}
                 
-                selected_hdd = st.selectbox("Select HDD", hdd_list if hdd_list else [""])
+                selected_hdd = labeled_selectbox("Select HDD", hdd_labels)
             
             with col2:
                 # Get approved users with HDD status
@@ -340,20 +335,20 @@ def render_add_assign_hdd_tab(user):
                     with db_connection() as conn:
                         c = conn.cursor()
                         users = c.execute("SELECT username FROM users WHERE role='user' AND approved=1").fetchall()
-                        user_list = format_user_list_with_hdd_status(users, include_not_assigned=False)
-                except:
-                    user_list = []
+                        user_labels = format_user_list_with_hdd_status(users, include_not_assigned=False)
+                except sqlite3.Error as e:
+                    warn_db_error(e, user)
+                    user_labels = {}
                 
-                team_code_selection = st.selectbox("Assign to User", user_list if user_list else [""])
+                team_code = labeled_selectbox("Assign to User", user_labels)
                 st.caption("🟢 = Available | 🔴 = Already has HDD")
             
             if st.form_submit_button("📤 Assign HDD", use_container_width=True):
-                team_code = extract_username_from_selection(team_code_selection)
                 if not selected_hdd or not team_code:
                     st.error("⚠️ Select HDD and User")
                 else:
                     try:
-                        serial_no = selected_hdd.split(" - ")[0]
+                        serial_no = selected_hdd
                         with db_connection() as conn:
                             c = conn.cursor()
                             c.execute("""
@@ -377,49 +372,50 @@ def render_add_assign_hdd_tab(user):
             with db_connection() as conn:
                 c = conn.cursor()
                 hdds = c.execute("""
-                    SELECT serial_no, unit_space, status, team_code, assigned_subuser
+                    SELECT serial_no, unit_space, status, team_code
                     FROM hdd_records
                     ORDER BY id DESC
                 """).fetchall()
-                hdd_delete_list = [
-                    f"{h['serial_no']} - {h['unit_space']} ({h['status']}) - Team: {h['team_code'] or 'Unassigned'}"
-                    for h in hdds
-                ]
-        except:
-            hdd_delete_list = []
+                hdd_delete_labels = {
+                    sn: f"{sn} - {us} ({status}) - Team: {team or 'Unassigned'}"
+                    for sn, us, status, team in hdds
+                }
+        except sqlite3.Error as e:
+            warn_db_error(e, user)
+            hdd_delete_labels = {}
 
         with st.form("delete_hdd_form"):
-            selected_hdd_delete = st.selectbox(
-                "Select HDD to Delete",
-                hdd_delete_list if hdd_delete_list else ["No HDDs available"]
-            )
+            selected_hdd_delete = labeled_selectbox("Select HDD to Delete", hdd_delete_labels, empty="No HDDs available")
 
             # Show warning for HDDs with data
-            if selected_hdd_delete and selected_hdd_delete != "No HDDs available":
-                serial_to_delete = selected_hdd_delete.split(" - ")[0]
+            if selected_hdd_delete in hdd_delete_labels:
+                serial_to_delete = selected_hdd_delete
                 try:
                     with db_connection() as conn:
                         c = conn.cursor()
-                        record = c.execute(
-                            "SELECT premise_name, data_details FROM hdd_records WHERE serial_no=?",
-                            (serial_to_delete,)
-                        ).fetchone()
+                        # Entries and history live in their own tables; legacy notes predate data_entries
+                        record = c.execute("""
+                            SELECT EXISTS(SELECT 1 FROM data_entries WHERE hdd_id=h.id)
+                                OR EXISTS(SELECT 1 FROM hdd_audit WHERE serial_no=h.serial_no)
+                                OR COALESCE(h.data_details, '') != '' AS has_data
+                            FROM hdd_records h WHERE h.serial_no=?
+                        """, (serial_to_delete,)).fetchone()
 
-                        if record and (record['premise_name'] or record['data_details']):
-                            st.error("⚠️ This HDD contains data entries. Deleting will remove all associated data!")
-                except:
-                    pass
+                        if record and record['has_data']:
+                            st.error("⚠️ This HDD has data entries or history. Deleting will remove all associated data!")
+                except sqlite3.Error as e:
+                    warn_db_error(e, user)
 
             confirm_delete = st.checkbox("I confirm I want to delete this HDD record")
 
             if st.form_submit_button("🗑️ Delete HDD", type="primary", use_container_width=True):
                 if not confirm_delete:
                     st.error("⚠️ Please confirm deletion by checking the box")
-                elif not selected_hdd_delete or selected_hdd_delete == "No HDDs available":
+                elif selected_hdd_delete not in hdd_delete_labels:
                     st.error("⚠️ Please select a valid HDD")
                 else:
                     try:
-                        serial_to_delete = selected_hdd_delete.split(" - ")[0]
+                        serial_to_delete = selected_hdd_delete
 
                         with db_connection() as conn:
                             c = conn.cursor()
@@ -433,7 +429,12 @@ def render_add_assign_hdd_tab(user):
                             if extraction_check and extraction_check['cnt'] > 0:
                                 st.error(f"❌ Cannot delete: HDD {serial_to_delete} has extraction records. Delete those first.")
                             else:
-                                # Delete the HDD record
+                                # Delete the HDD record, its data entries and audit trail
+                                c.execute("""
+                                    DELETE FROM data_entries
+                                    WHERE hdd_id IN (SELECT id FROM hdd_records WHERE serial_no=?)
+                                """, (serial_to_delete,))
+                                c.execute("DELETE FROM hdd_audit WHERE serial_no=?", (serial_to_delete,))
                                 c.execute("DELETE FROM hdd_records WHERE serial_no=?", (serial_to_delete,))
                                 conn.commit()
 
@@ -465,7 +466,8 @@ def render_extraction_tab(user):
                     ORDER BY team_code
                 """).fetchall()
                 user_options = ["All Users"] + [u['team_code'] for u in users_with_sealed]
-        except:
+        except sqlite3.Error as e:
+            warn_db_error(e, user)
             user_options = ["All Users"]
 
         selected_user = st.selectbox("Filter by User", user_options, key="extraction_user_filter")
@@ -490,11 +492,12 @@ def render_extraction_tab(user):
                                 WHERE status='sealed' AND team_code=?
                                 ORDER BY serial_no
                             """, (selected_user,)).fetchall()
-                        hdd_list = [f"{h['serial_no']} - {h['unit_space']} (User: {h['team_code']})" for h in hdds]
-                except:
-                    hdd_list = []
+                        hdd_labels = {sn: f"{sn} - {us} (User: {team})" for sn, team, us in hdds}
+                except sqlite3.Error as e:
+                    warn_db_error(e, user)
+                    hdd_labels = {}
 
-                selected_hdd = st.selectbox("Select Sealed HDD", hdd_list if hdd_list else ["No sealed HDDs available"])
+                selected_hdd = labeled_selectbox("Select Sealed HDD", hdd_labels, empty="No sealed HDDs available")
                 if selected_user != "All Users":
                     st.caption(f"📌 Showing HDDs for: {selected_user}")
 
@@ -506,11 +509,12 @@ def render_extraction_tab(user):
                     with db_connection() as conn:
                         c = conn.cursor()
                         users = c.execute("SELECT username FROM users WHERE role='user' AND approved=1").fetchall()
-                        user_list = format_user_list_with_hdd_status(users, include_not_assigned=True)
-                except:
-                    user_list = ["-- Not Assigned --"]
+                        user_labels = format_user_list_with_hdd_status(users, include_not_assigned=True)
+                except sqlite3.Error as e:
+                    warn_db_error(e, user)
+                    user_labels = {None: "-- Not Assigned --"}
                 
-                assign_to_user = st.selectbox("Assign to User (Optional)", user_list)
+                assigned_user = labeled_selectbox("Assign to User (Optional)", user_labels)
                 st.caption("🟢 = Available | 🔴 = Already has HDD")
             
             with col2:
@@ -519,20 +523,19 @@ def render_extraction_tab(user):
                 date_receiving = st.date_input("Date of Receiving Extraction Copy")
             
             if st.form_submit_button("📤 Send for Extraction", use_container_width=True):
-                if not selected_hdd or selected_hdd == "No sealed HDDs available" or not extraction_vendor:
+                if selected_hdd not in hdd_labels or not extraction_vendor:
                     st.error("⚠️ Fill required fields and select a valid HDD")
                 else:
                     try:
-                        # Extract serial number from new format: "SN123 - 1TB (User: username)"
-                        original_sn = selected_hdd.split(" - ")[0]
+                        original_sn = selected_hdd
                         working_copies = [s.strip() for s in working_copy_sns.split('\n') if s.strip()]
-                        assigned_user = extract_username_from_selection(assign_to_user)
                         
                         with db_connection() as conn:
                             c = conn.cursor()
                             orig = c.execute("SELECT * FROM hdd_records WHERE serial_no=?", (original_sn,)).fetchone()
+                            data_details = get_full_data_details(c, [orig])[orig['id']]
                             
-                            now = datetime.utcnow().isoformat()
+                            now = utcnow().isoformat()
                             c.execute("""
                                 INSERT INTO extraction_records
                                 (original_hdd_sn, unit_space, team_code, data_details,
@@ -540,7 +543,7 @@ def render_extraction_tab(user):
                                  working_copy_sns, date_receiving, assigned_user, created_by, created_on)
                                 VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
                             """, (original_sn, orig['unit_space'], orig['team_code'],
-                                  orig['data_details'], date_extraction_start.isoformat(),
+                                  data_details, date_extraction_start.isoformat(),
                                   extracted_hdd_sn, extraction_vendor, json.dumps(working_copies),
                                   date_receiving.isoformat(), assigned_user, user, now))
                             
@@ -571,7 +574,8 @@ def render_extraction_tab(user):
                         ORDER BY team_code
                     """).fetchall()
                     extraction_user_options = ["All Users"] + [u['team_code'] for u in users_in_extraction]
-            except:
+            except sqlite3.Error as e:
+                warn_db_error(e, user)
                 extraction_user_options = ["All Users"]
 
             extraction_user_filter = st.selectbox("Filter by User", extraction_user_options, key="extraction_history_filter")
@@ -620,11 +624,12 @@ def render_analysis_tab(user):
                         SELECT extracted_hdd_sn, extracted_by FROM extraction_records
                         WHERE extracted_hdd_sn IS NOT NULL
                     """).fetchall()
-                    extract_list = [f"{e['extracted_hdd_sn']} (by {e['extracted_by']})" for e in extracts]
-            except:
-                extract_list = []
+                    extract_labels = {sn: f"{sn} (by {by})" for sn, by in extracts}
+            except sqlite3.Error as e:
+                warn_db_error(e, user)
+                extract_labels = {}
             
-            selected_extract = st.selectbox("Select Extracted HDD", extract_list if extract_list else [""])
+            selected_extract = labeled_selectbox("Select Extracted HDD", extract_labels)
             analyst_name = st.text_input("Analyst Name", placeholder="Analyst/Team name")
         
         with col2:
@@ -636,11 +641,11 @@ def render_analysis_tab(user):
                 st.error("⚠️ Fill required fields")
             else:
                 try:
-                    extracted_sn = selected_extract.split(" (")[0]
+                    extracted_sn = selected_extract
                     
                     with db_connection() as conn:
                         c = conn.cursor()
-                        now = datetime.utcnow().isoformat()
+                        now = utcnow().isoformat()
                         c.execute("""
                             INSERT INTO analysis_records
                             (extracted_hdd_sn, analyst_name, date_disburse, 
@@ -681,20 +686,23 @@ def render_edit_records_tab(user):
         with db_connection() as conn:
             c = conn.cursor()
             hdds = c.execute("SELECT serial_no, team_code, status FROM hdd_records ORDER BY id DESC LIMIT 100").fetchall()
-            hdd_list = [f"{h['serial_no']} - {h['team_code'] or 'Unassigned'} ({h['status']})" for h in hdds]
-    except:
-        hdd_list = []
+            hdd_labels = {sn: f"{sn} - {team or 'Unassigned'} ({status})" for sn, team, status in hdds}
+    except sqlite3.Error as e:
+        warn_db_error(e, user)
+        hdd_labels = {}
     
-    selected = st.selectbox("Select HDD", hdd_list if hdd_list else [""])
+    selected = labeled_selectbox("Select HDD", hdd_labels)
     
     if selected:
-        serial_no = selected.split(" - ")[0]
+        serial_no = selected
         
         try:
             with db_connection() as conn:
                 c = conn.cursor()
                 record = c.execute("SELECT * FROM hdd_records WHERE serial_no=?", (serial_no,)).fetchone()
-        except:
+                full_details = get_full_data_details(c, [record])[record['id']] if record else ''
+        except sqlite3.Error as e:
+            warn_db_error(e, user)
             record = None
         
         if record:
@@ -712,7 +720,10 @@ def render_edit_records_tab(user):
                                         index=["available", "issued", "sealed", "returned", "in_extraction"].index(record['status']) if record['status'] in ["available", "issued", "sealed", "returned", "in_extraction"] else 0)
                     unit_space = st.text_input("Unit Space", value=record['unit_space'] or "")
                 
-                data_details = st.text_area("Data Details", value=record['data_details'] or "", height=150)
+                # Subuser entries live in data_entries; only the legacy notes column is editable here
+                st.text_area("Data Details (entries and history)", value=full_details, height=200, disabled=True)
+                data_details = st.text_area("Legacy Notes (hdd_records.data_details)",
+                                            value=record['data_details'] or "", height=100)
                 
                 if st.form_submit_button("💾 Update Record", use_container_width=True):
                     try:
@@ -746,12 +757,12 @@ def render_approve_users_tab(user):
         users = []
     
     if users:
-        user_options = [f"{u['username']} - {'Approved' if u['approved'] else 'Not Approved'}" for u in users]
-        selected = st.selectbox("Select User", user_options)
+        approved = {uname: bool(a) for uname, a in users}
+        user_labels = {u: f"{u} - {'Approved' if a else 'Not Approved'}" for u, a in approved.items()}
+        selected_user = labeled_selectbox("Select User", user_labels)
         
-        if selected:
-            selected_user = selected.split(" - ")[0]
-            current_status = selected.split(" - ")[1] == "Approved"
+        if selected_user:
+            current_status = approved[selected_user]
             
             action = st.radio("Action", ["Approve", "Disapprove"], index=0 if not current_status else 1)
             
@@ -805,7 +816,7 @@ def render_users_tab(user):
                         with db_connection() as conn:
                             c = conn.cursor()
                             pw_hash = hash_password(pwd)
-                            expiry = (datetime.utcnow() + timedelta(days=90)).isoformat()
+                            expiry = (utcnow() + timedelta(days=90)).isoformat()
                             c.execute("""
                                 INSERT INTO users(username, password_hash, role, approved, password_expiry) 
                                 VALUES (?,?,?,1,?)
@@ -833,7 +844,7 @@ def render_users_tab(user):
                     try:
                         with db_connection() as conn:
                             c = conn.cursor()
-                            expiry = (datetime.utcnow() + timedelta(days=90)).isoformat()
+                            expiry = (utcnow() + timedelta(days=90)).isoformat()
                             c.execute("UPDATE users SET password_hash=?, password_expiry=? WHERE username=?",
                                     (hash_password(newp), expiry, reset_user))
                             conn.commit()
@@ -850,7 +861,8 @@ def render_subusers_tab(user):
         with db_connection() as conn:
             c = conn.cursor()
             subusers = c.execute("SELECT username, valid_till, parent_user FROM users WHERE role='subuser' ORDER BY id DESC").fetchall()
-    except:
+    except sqlite3.Error as e:
+        warn_db_error(e, user)
         subusers = []
     
     if subusers:
@@ -866,11 +878,12 @@ def render_subusers_tab(user):
                 with db_connection() as conn:
                     c = conn.cursor()
                     users_list = c.execute("SELECT username FROM users WHERE role='user' AND approved=1").fetchall()
-                    parent_users = format_user_list_with_hdd_status(users_list, include_not_assigned=False)
-            except:
-                parent_users = []
+                    parent_labels = format_user_list_with_hdd_status(users_list, include_not_assigned=False)
+            except sqlite3.Error as e:
+                warn_db_error(e, user)
+                parent_labels = {}
             
-            parent_team_selection = st.selectbox("Parent User", parent_users if parent_users else [""])
+            parent_team = labeled_selectbox("Parent User", parent_labels)
             st.caption("🟢 = Available | 🔴 = Already has HDD")
             uname = st.text_input("Subuser Username", placeholder="e.g., MSD-1")
         
@@ -879,7 +892,6 @@ def render_subusers_tab(user):
             st.caption("⏰ Auto-expires in 7 days")
         
         if st.form_submit_button("Create Subuser", use_container_width=True):
-            parent_team = extract_username_from_selection(parent_team_selection)
             if not uname or not pwd or not parent_team:
                 st.error("⚠️ Fill all fields")
             elif len(pwd) < 6:
@@ -888,7 +900,7 @@ def render_subusers_tab(user):
                 try:
                     with db_connection() as conn:
                         c = conn.cursor()
-                        valid_till = (datetime.utcnow() + timedelta(days=7)).isoformat()
+                        valid_till = (utcnow() + timedelta(days=7)).isoformat()
                         pw_hash = hash_password(pwd)
                         c.execute("""
                             INSERT INTO users(username, password_hash, role, approved, valid_till, parent_user) 
@@ -932,11 +944,14 @@ def render_records_tab():
             
             query += " ORDER BY id " + ("DESC" if sort_by == "Newest" else "ASC" if sort_by == "Oldest" else "serial_no")
             rows = c.execute(query, params).fetchall()
+            details = get_full_data_details(c, rows)
     except Exception as e:
         st.error(f"❌ Database error: {e}")
         rows = []
     
     df = safe_dataframe(rows, "hdd_records")
+    if not df.empty:
+        df['data_details'] = df['id'].map(details)
     
     if not df.empty:
         # Status summary metrics
@@ -972,7 +987,9 @@ def render_exports_tab():
         with db_connection() as conn:
             c = conn.cursor()
             rows = c.execute("SELECT * FROM hdd_records ORDER BY id DESC").fetchall()
-    except:
+            details = get_full_data_details(c, rows)
+    except sqlite3.Error as e:
+        warn_db_error(e)
         rows = []
 
     if rows:
@@ -982,13 +999,15 @@ def render_exports_tab():
             try:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
+                # Export the complete details rather than just the legacy column
+                data = [{**dict(r), 'data_details': details[r['id']]} for r in rows]
+
                 if export_format == "JSON":
-                    data = [dict(r) for r in rows]
                     st.download_button("⬇️ Download JSON", json.dumps(data, indent=2),
                                      f"dtrack_{timestamp}.json", "application/json", use_container_width=True)
 
                 else:
-                    df = pd.DataFrame([dict(r) for r in rows])
+                    df = pd.DataFrame(data)
                     buf = io.BytesIO()
                     with pd.ExcelWriter(buf, engine='openpyxl') as writer:
                         df.to_excel(writer, index=False, sheet_name='Records')
@@ -1024,7 +1043,8 @@ def render_logs_tab():
             
             query += f" ORDER BY id DESC LIMIT {limit}"
             rows = c.execute(query, params).fetchall()
-    except:
+    except sqlite3.Error as e:
+        warn_db_error(e)
         rows = []
     
     df = safe_dataframe(rows, "logs")
@@ -1039,41 +1059,16 @@ def admin_panel(user):
     st.header("Admin Panel (DIAL)")
     st.caption(f"Logged in as: {user}")
     
-    tabs = st.tabs([
-        "💿 Add/Assign HDD", "🔬 Extraction", "🔍 Analysis", 
-        "✏️ Edit Records", "👥 Users", "👤 Subusers", "✔️ Approvals", 
-        "💾 Records", "📥 Exports", "📋 Logs", "⚙️ Settings"
-    ])
-    
-    with tabs[0]:
-        render_add_assign_hdd_tab(user)
-    
-    with tabs[1]:
-        render_extraction_tab(user)
-    
-    with tabs[2]:
-        render_analysis_tab(user)
-    
-    with tabs[3]:
-        render_edit_records_tab(user)
-    
-    with tabs[4]:
-        render_users_tab(user)
-    
-    with tabs[5]:
-        render_subusers_tab(user)
-    
-    with tabs[6]:
-        render_approve_users_tab(user)
-    
-    with tabs[7]:
-        render_records_tab()
-    
-    with tabs[8]:
-        render_exports_tab()
-    
-    with tabs[9]:
-        render_logs_tab()
-    
-    with tabs[10]:
-        render_settings_tab(user)
\ No newline at end of file
+    render_open_tab("admin_panel_tab", {
+        "💿 Add/Assign HDD": render_add_assign_hdd_tab,
+        "🔬 Extraction": render_extraction_tab,
+        "🔍 Analysis": render_analysis_tab,
+        "✏️ Edit Records": render_edit_records_tab,
+        "👥 Users": render_users_tab,
+        "👤 Subusers": render_subusers_tab,
+        "✔️ Approvals": render_approve_users_tab,
+        "💾 Records": lambda _: render_records_tab(),
+        "📥 Exports": lambda _: render_exports_tab(),
+        "📋 Logs": lambda _: render_logs_tab(),
+        "⚙️ Settings": render_settings_tab,
+    }, user)
@@ -1,14 +1,15 @@
 import streamlit as st
-import pandas as pd
+import threading
+import time
 from contextlib import contextmanager
 from datetime import datetime, timedelta
-from db import init_db, get_conn
-from utils import (check_password, hash_password, get_user, log_action, 
-                   create_user, ensure_default_admin)
-import admin, user_panel, subuser_panel
-from PIL import Image
+from db import init_db, pooled_conn
+from utils import (hash_password, get_user, log_action, 
+                   create_user, ensure_default_admin, submit_check_password,
+                   utcnow)
 
 def fix_selectbox_color():
+    # Elements only persist for the run that emits them, so this stays per rerun
     st.markdown("""
         <style>
 
@@ -55,16 +56,28 @@ st.set_page_config(
     initial_sidebar_state='expanded'
 )
 
+@st.cache_resource
+def _init_db():
+    """Create tables, indexes and the default admin once per server process, not on every rerun"""
+    init_db()
+    ensure_default_admin()
+
+
+@st.cache_resource
+def _logo_bytes():
+    """Header logo file contents, read once per server process"""
+    with open('assets/logo.jpg', 'rb') as f:
+        return f.read()
+
+
 # Initialize
-init_db()
-ensure_default_admin()
+_init_db()
 fix_selectbox_color()
 # Enhanced CSS
 
 
 # Header
-logo = Image.open('assets/logo.jpg')
-st.image(logo, width=450)
+st.image(_logo_bytes(), width=450)
 # st.caption("DIAL - Digital Intelligence & Analytics Lab")
 
 # Initialize session state
@@ -86,19 +99,23 @@ init_session_state()
 @contextmanager
 def db_connection():
     """Context manager for database connections"""
-    conn = None
     try:
-        conn = get_conn()
-        yield conn
+        with pooled_conn() as conn:
+            yield conn
     except Exception as e:
         st.error(f"Database error: {e}")
         raise
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception:
-                pass
+
+
+# Consecutive wrong passwords allowed before a username is throttled
+LOGIN_FAILURE_LIMIT = 5
+LOGIN_LOCKOUT_SECONDS = 30
+
+
+@st.cache_resource
+def _login_failures():
+    """Process-wide map of username -> (consecutive failures, last failure time), with its lock"""
+    return {}, threading.Lock()
 
 
 def render_login():
@@ -116,10 +133,21 @@ def render_login():
                 st.error('⚠️ Please enter both username and password.')
                 return
             
+            # Reject throttled usernames before touching the DB or the hasher
+            failures, failures_lock = _login_failures()
+            with failures_lock:
+                fails, last_fail = failures.get(uname, (0, 0.0))
+            if fails >= LOGIN_FAILURE_LIMIT and time.time() - last_fail < LOGIN_LOCKOUT_SECONDS:
+                st.error('🚫 Too many failed attempts. Please wait and try again.')
+                return
+            
             try:
                 with db_connection() as conn:
                     c = conn.cursor()
-                    row = c.execute('SELECT * FROM users WHERE username=?', (uname,)).fetchone()
+                    row = c.execute('''
+                        SELECT role, approved, password_hash, password_expiry, valid_till
+                        FROM users WHERE username=?
+                    ''', (uname,)).fetchone()
                     
                     if not row:
                         st.error('❌ User not found.')
@@ -130,31 +158,51 @@ def render_login():
                         st.warning('⏳ Your account is pending admin approval.')
                         return
                     
-                    if not check_password(pwd, row['password_hash']):
-                        st.error('❌ Invalid password.')
-                        log_action(uname, 'login_failed_wrong_password')
-                        return
+                    # Verify the password on the hash pool while the expiry
+                    # fields are parsed below
+                    hash_future = submit_check_password(pwd, row['password_hash'])
+                    now = utcnow()
                     
                     # Check password expiry
+                    password_expired = False
                     if row['password_expiry']:
                         try:
-                            if datetime.fromisoformat(row['password_expiry']) < datetime.utcnow():
-                                st.warning('🔑 Your password has expired. Contact admin to reset.')
-                                return
+                            password_expired = datetime.fromisoformat(row['password_expiry']) < now
                         except Exception:
                             pass
                     
                     # Check subuser validity
+                    account_expired = account_invalid = False
                     if row['role'] == 'subuser' and row['valid_till']:
                         try:
-                            if datetime.fromisoformat(row['valid_till']) < datetime.utcnow():
-                                st.error('⏰ Sub-user account has expired.')
-                                return
+                            account_expired = datetime.fromisoformat(row['valid_till']) < now
                         except Exception:
-                            st.error('⚠️ Invalid account validity. Contact admin.')
-                            return
+                            account_invalid = True
+                    
+                    if not hash_future.result():
+                        # Re-read under the lock so concurrent failures each count
+                        with failures_lock:
+                            fails, _ = failures.get(uname, (0, 0.0))
+                            failures[uname] = (fails + 1, time.time())
+                        st.error('❌ Invalid password.')
+                        log_action(uname, 'login_failed_wrong_password')
+                        return
+                    
+                    if password_expired:
+                        st.warning('🔑 Your password has expired. Contact admin to reset.')
+                        return
+                    
+                    if account_invalid:
+                        st.error('⚠️ Invalid account validity. Contact admin.')
+                        return
+                    
+                    if account_expired:
+                        st.error('⏰ Sub-user account has expired.')
+                        return
                     
                     # Successful login
+                    with failures_lock:
+                        failures.pop(uname, None)
                     st.session_state.logged_in = True
                     st.session_state.user = uname
                     st.session_state.role = row['role']
@@ -332,15 +380,19 @@ def main():
                     st.session_state[key] = None if key != 'logged_in' else False
                 st.rerun()
             
-            # Route to appropriate panel
+            # Route to appropriate panel; panels (and pandas) are imported
+            # here so the login/register pages don't pay for them
             role = st.session_state.role
             user = st.session_state.user
             
             if role == 'admin':
+                import admin
                 admin.admin_panel(user)
             elif role == 'user':
+                import user_panel
                 user_panel.user_panel(user)
             elif role == 'subuser':
+                import subuser_panel
                 subuser_panel.subuser_panel(user)
             
             # Quick HDD form for all logged-in users
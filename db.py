@@ -1,5 +1,8 @@
 import sqlite3
 import os
+import queue
+from contextlib import contextmanager
+from functools import lru_cache
 
 DB_PATH = os.getenv("DB_PATH", "dtrack.db")
 
@@ -10,20 +13,48 @@ DB_PATH = os.getenv("DB_PATH", "dtrack.db")
 def get_conn():
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    # Per-connection settings; journal_mode=WAL is persistent and set in init_db
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=3000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA mmap_size=268435456")
     return conn
 
+# Idle connections kept for reuse; LIFO so the most recently used (warmest) one goes out first
+POOL_SIZE = 8
+_POOL = queue.LifoQueue(maxsize=POOL_SIZE)
+
+@contextmanager
+def pooled_conn():
+    """Borrow a long-lived connection; it goes back to the pool with no transaction open"""
+    try:
+        conn = _POOL.get_nowait()
+    except queue.Empty:
+        conn = get_conn()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            _POOL.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+@lru_cache(maxsize=None)
 def get_columns(table: str):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute(f"PRAGMA table_info({table})")
-    cols = [row[1] for row in c.fetchall()]
-    conn.close()
-    return cols
+    """Column names of a table; the schema only changes in init_db, which clears this cache"""
+    with pooled_conn() as conn:
+        return tuple(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
 
 def init_db():
     conn = get_conn()
     c = conn.cursor()
     
+    # WAL lets the read-only tabs proceed while a writer holds the lock
+    c.execute("PRAGMA journal_mode=WAL")
+    
     # Users table
     c.execute("""
         CREATE TABLE IF NOT EXISTS users (
@@ -60,6 +91,35 @@ def init_db():
         )
     """)
     
+    # Data entries - one row per subuser data entry against an HDD
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS data_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hdd_id INTEGER NOT NULL,
+            author TEXT,
+            ts TEXT,
+            premise TEXT,
+            date_search TEXT,
+            date_seized TEXT,
+            details TEXT,
+            FOREIGN KEY (hdd_id) REFERENCES hdd_records(id)
+        )
+    """)
+    
+    # HDD audit trail - assignment/sealing events, one row each
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS hdd_audit (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            serial_no TEXT NOT NULL,
+            team_code TEXT,
+            action TEXT,
+            actor TEXT,
+            target TEXT,
+            ts TEXT,
+            notes TEXT
+        )
+    """)
+    
     # Extraction records - admin disburses to vendor when received from user
     c.execute("""
         CREATE TABLE IF NOT EXISTS extraction_records (
@@ -135,13 +195,30 @@ def init_db():
     # Indexes
     c.execute("CREATE INDEX IF NOT EXISTS idx_hdd_team ON hdd_records(team_code)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_hdd_subuser ON hdd_records(assigned_subuser)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_hdd_serial ON hdd_records(serial_no)")
+    # serial_no is UNIQUE, so its automatic index already serves serial_no=? [AND team_code=?]
+    c.execute("DROP INDEX IF EXISTS idx_hdd_serial")
     c.execute("CREATE INDEX IF NOT EXISTS idx_hdd_status ON hdd_records(status)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_users_parent ON users(parent_user)")
+    # Subuser listing: WHERE parent_user=? AND role='subuser'; supersedes idx_users_parent
+    c.execute("DROP INDEX IF EXISTS idx_users_parent")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_parent_role ON users(parent_user, role)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_options_type ON options(type)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_data_entries_hdd ON data_entries(hdd_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_hdd_audit_serial_ts ON hdd_audit(serial_no, ts)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_extraction_original_sn ON extraction_records(original_hdd_sn)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_analysis_extracted_sn ON analysis_records(extracted_hdd_sn)")
+    # Subuser lookups: WHERE team_code=? AND assigned_subuser=? [AND status=?]
+    c.execute("CREATE INDEX IF NOT EXISTS idx_hdd_team_sub_status ON hdd_records(team_code, assigned_subuser, status)")
+    # Team lookups by status, already in id order
+    c.execute("CREATE INDEX IF NOT EXISTS idx_hdd_team_status ON hdd_records(team_code, status, id DESC)")
+    
+    # Planner statistics: full ANALYZE once, then let PRAGMA optimize refresh them
+    if not c.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'").fetchone():
+        c.execute("ANALYZE")
+    c.execute("PRAGMA optimize")
     
     conn.commit()
     conn.close()
+    get_columns.cache_clear()
 
 init_db()
\ No newline at end of file
@@ -1,9 +1,10 @@
 from db import get_conn
-from datetime import datetime, date
+from datetime import date, datetime, timezone
 
 def seed():
     conn = get_conn(); c = conn.cursor()
-    now = datetime.utcnow().isoformat()
+    # Naive UTC, like utils.utcnow(); importing utils would pull in streamlit and its worker threads
+    now = datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
     rows = [
         ("SN-ABC12345", "1TB", "TEAM1", "Premise A", date.today().isoformat(), date.today().isoformat(), "Case data A", "admin", now, "SN-ABC12345", "available"),
         ("SN-XYZ67890", "2TB", "TEAM2", "Premise B", date.today().isoformat(), date.today().isoformat(), "Case data B", "admin", now, "SN-XYZ67890", "sealed"),
@@ -1,28 +1,14 @@
+import sqlite3
 import streamlit as st
-import pandas as pd
 from contextlib import contextmanager
-from db import get_conn, get_columns
-from utils import log_action
-from datetime import datetime
+from db import pooled_conn
+from utils import log_action, warn_db_error, render_open_tab, get_full_data_details, utcnow
+from datetime import datetime, date
 
 @contextmanager
 def db_connection():
-    conn = None
-    try:
-        conn = get_conn()
+    with pooled_conn() as conn:
         yield conn
-    finally:
-        if conn:
-            conn.close()
-
-def safe_dataframe(rows, table: str):
-    try:
-        if rows:
-            return pd.DataFrame(rows, columns=rows[0].keys())
-        cols = get_columns(table)
-        return pd.DataFrame([], columns=cols)
-    except Exception:
-        return pd.DataFrame([])
 
 def get_parent_user(subuser):
     """Get parent user of subuser"""
@@ -31,9 +17,27 @@ def get_parent_user(subuser):
             c = conn.cursor()
             result = c.execute("SELECT parent_user FROM users WHERE username=?", (subuser,)).fetchone()
             return result['parent_user'] if result else None
-    except:
+    except sqlite3.Error as e:
+        warn_db_error(e, subuser)
         return None
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def _today():
+    """Default for the date inputs; refreshed hourly rather than on every rerun"""
+    return date.today()
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_assigned_hdds(parent, user):
+    """Issued HDDs assigned to this subuser as (serial_no, unit_space) tuples"""
+    with db_connection() as conn:
+        c = conn.cursor()
+        hdds = c.execute("""
+            SELECT serial_no, unit_space FROM hdd_records 
+            WHERE team_code=? AND assigned_subuser=? AND status='issued'
+        """, (parent, user)).fetchall()
+        return [tuple(h) for h in hdds]
+
+@st.fragment
 def render_enter_data_tab(user):
     """Subuser enters seized data details only"""
     st.subheader("✏️ Enter Seized Data Details")
@@ -42,18 +46,14 @@ def render_enter_data_tab(user):
     st.info(f"ℹ️ Entering data for team: {parent}")
     
     # Get HDDs assigned to this subuser
+    # Options are serial numbers; the label is only for display
     try:
-        with db_connection() as conn:
-            c = conn.cursor()
-            hdds = c.execute("""
-                SELECT serial_no, unit_space FROM hdd_records 
-                WHERE team_code=? AND assigned_subuser=? AND status='issued'
-            """, (parent, user)).fetchall()
-            hdd_list = [f"{h['serial_no']} - {h['unit_space']}" for h in hdds]
-    except:
-        hdd_list = []
+        hdd_labels = {sn: f"{sn} - {us}" for sn, us in get_assigned_hdds(parent, user)}
+    except sqlite3.Error as e:
+        warn_db_error(e, user)
+        hdd_labels = {}
     
-    if not hdd_list:
+    if not hdd_labels:
         st.warning("⚠️ No HDDs assigned to you")
         st.caption("Contact your team lead to assign HDDs")
         return
@@ -62,12 +62,12 @@ def render_enter_data_tab(user):
         col1, col2 = st.columns(2)
         
         with col1:
-            selected_hdd = st.selectbox("Select HDD", hdd_list)
+            selected_hdd = st.selectbox("Select HDD", list(hdd_labels), format_func=hdd_labels.get)
             premise_name = st.text_input("Premise Name", placeholder="Office of Mr. ABC")
-            date_search = st.date_input("Date of Search")
+            date_search = st.date_input("Date of Search", value=_today())
         
         with col2:
-            date_seized = st.date_input("Date of Device Seized")
+            date_seized = st.date_input("Date of Device Seized", value=_today())
         
         data_details = st.text_area("Data Details", 
                                    placeholder="• Email dump of xyz.com\n• WhatsApp backup from device\n• Financial Excel files\n• Device forensic images",
@@ -78,54 +78,88 @@ def render_enter_data_tab(user):
                 st.error("⚠️ Fill all required fields")
             else:
                 try:
-                    serial_no = selected_hdd.split(" - ")[0]
+                    serial_no = selected_hdd
                     
                     with db_connection() as conn:
                         c = conn.cursor()
-                        now = datetime.utcnow().isoformat()
+                        now = utcnow().isoformat()
                         
-                        # Build data entry log
-                        data_entry = f"\n[DATA ENTRY {now} by {user}]:\nPremise: {premise_name}\nSearch Date: {date_search}\nSeized Date: {date_seized}\n\nData Details:\n{data_details}"
+                        # Record the entry, then refresh the summary fields on the HDD,
+                        # holding the write lock for both statements
+                        c.execute("BEGIN IMMEDIATE")
+                        c.execute("""
+                            INSERT INTO data_entries
+                            (hdd_id, author, ts, premise, date_search, date_seized, details)
+                            SELECT id, ?, ?, ?, ?, ?, ? FROM hdd_records
+                            WHERE serial_no=? AND team_code=? AND assigned_subuser=? AND status='issued'
+                        """, (user, now, premise_name, date_search.isoformat(), date_seized.isoformat(),
+                              data_details, serial_no, parent, user))
+                        if c.rowcount == 0:
+                            raise ValueError(f"HDD {serial_no} is no longer issued to you")
                         
-                        # Update record with data
                         c.execute("""
                             UPDATE hdd_records 
                             SET premise_name=?, 
                                 date_search=?, 
-                                date_seized=?, 
-                                data_details=COALESCE(data_details, '') || ?
-                            WHERE serial_no=? AND team_code=? AND assigned_subuser=?
+                                date_seized=?
+                            WHERE serial_no=? AND team_code=? AND assigned_subuser=? AND status='issued'
                         """, (premise_name, date_search.isoformat(), date_seized.isoformat(), 
-                              data_entry, serial_no, parent, user))
+                              serial_no, parent, user))
                         conn.commit()
                     
+                    _load_my_data.clear()
                     st.success(f"✅ Data saved for HDD {serial_no}")
                     log_action(user, f"enter_data:{serial_no}")
-                    st.rerun()
                 except Exception as e:
                     st.error(f"❌ Error: {e}")
 
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_my_data(parent, user):
+    """(total, with_data) counts, HDD rows with data and their formatted details for this subuser"""
+    with db_connection() as conn:
+        c = conn.cursor()
+        metrics = c.execute("""
+            SELECT COUNT(*) AS total, SUM(premise_name IS NOT NULL) AS with_data
+            FROM hdd_records
+            WHERE team_code=? AND assigned_subuser=?
+        """, (parent, user)).fetchone()
+        rows = c.execute("""
+            SELECT id, serial_no, premise_name, date_search, date_seized, data_details
+            FROM hdd_records
+            WHERE team_code=? AND assigned_subuser=? AND premise_name IS NOT NULL
+            ORDER BY id DESC
+        """, (parent, user)).fetchall()
+        details = get_full_data_details(c, rows)
+    return (metrics['total'], metrics['with_data'] or 0), [dict(row) for row in rows], details
+
+@st.fragment
 def render_my_hdds_tab(user):
     """View data entered by this subuser"""
     st.subheader("💾 My Saved Data")
+    # Clicking reruns only this fragment, picking up newly saved entries
+    if st.button("🔄 Refresh", key="refresh_my_data"):
+        _load_my_data.clear()
 
     parent = get_parent_user(user)
 
     try:
-        with db_connection() as conn:
-            c = conn.cursor()
-            rows = c.execute("""
-                SELECT serial_no, premise_name, date_search, date_seized, data_details
-                FROM hdd_records
-                WHERE team_code=? AND assigned_subuser=? AND premise_name IS NOT NULL
-                ORDER BY id DESC
-            """, (parent, user)).fetchall()
+        metrics, rows, details = _load_my_data(parent, user)
     except Exception as e:
         st.error(f"❌ Database error: {e}")
+        metrics = None
         rows = []
 
+    if metrics:
+        total, with_data = metrics
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("💿 Assigned HDDs", total)
+        with col2:
+            st.metric("✅ With Data", with_data)
+        with col3:
+            st.metric("⏳ Pending Data", total - with_data)
+
     if rows:
-        st.caption(f"📊 Total Data Entries: {len(rows)}")
 
         # Display each data entry
         for row in rows:
@@ -140,13 +174,14 @@ def render_my_hdds_tab(user):
 
                 st.markdown("---")
                 st.markdown("**📝 Data Details:**")
-                if row['data_details']:
-                    st.text_area("", value=row['data_details'], height=200, disabled=True, key=f"data_{row['serial_no']}", label_visibility="collapsed")
+                if details[row['id']]:
+                    st.text_area("", value=details[row['id']], height=200, disabled=True, key=f"data_{row['serial_no']}", label_visibility="collapsed")
                 else:
                     st.info("No data details recorded")
     else:
         st.info("🔭 No data saved yet. Go to 'Enter Data' tab to add data.")
 
+@st.fragment
 def render_account_tab(user):
     """Display subuser account info"""
     st.subheader("👤 Account Information")
@@ -158,7 +193,8 @@ def render_account_tab(user):
                 SELECT username, role, valid_till, parent_user 
                 FROM users WHERE username=?
             """, (user,)).fetchone()
-    except:
+    except sqlite3.Error as e:
+        warn_db_error(e, user)
         info = None
     
     if info:
@@ -171,7 +207,7 @@ def render_account_tab(user):
         with col2:
             if info['valid_till']:
                 valid_date = datetime.fromisoformat(info['valid_till'])
-                days_left = (valid_date - datetime.utcnow()).days
+                days_left = (valid_date - utcnow()).days
                 
                 if days_left <= 0:
                     st.metric("Status", "EXPIRED", delta="Account expired")
@@ -201,23 +237,18 @@ def subuser_panel(user):
             
             if info and info['valid_till']:
                 valid_date = datetime.fromisoformat(info['valid_till'])
-                if valid_date < datetime.utcnow():
+                if valid_date < utcnow():
                     st.error("⚠️ Your account has expired. Contact your team lead.")
                     st.stop()
                 
-                days_left = (valid_date - datetime.utcnow()).days
+                days_left = (valid_date - utcnow()).days
                 if days_left <= 2:
                     st.warning(f"⚠️ Account expires in {days_left} day(s)")
-    except:
-        pass
-    
-    tabs = st.tabs(["✏️ Enter Data", "💿 My HDDs", "👤 Account"])
-    
-    with tabs[0]:
-        render_enter_data_tab(user)
-    
-    with tabs[1]:
-        render_my_hdds_tab(user)
+    except sqlite3.Error as e:
+        warn_db_error(e, user)
     
-    with tabs[2]:
-        render_account_tab(user)
\ No newline at end of file
+    render_open_tab("subuser_panel_tab", {
+        "✏️ Enter Data": render_enter_data_tab,
+        "💿 My HDDs": render_my_hdds_tab,
+        "👤 Account": render_account_tab,
+    }, user)
\ No newline at end of file
@@ -1,27 +1,28 @@
+import sqlite3
 import streamlit as st
 import pandas as pd
+import numpy as np
 from contextlib import contextmanager
-from db import get_conn, get_columns
-from utils import log_action, hash_password
-from datetime import datetime, timedelta
+from db import get_columns, pooled_conn
+from utils import (log_action, warn_db_error, render_open_tab, hash_password, get_data_entries, get_hdd_audit,
+                   format_data_details, utcnow, group_in_batches)
+from subuser_panel import get_assigned_hdds
+from datetime import timedelta
 import io, csv, json
 
 @contextmanager
 def db_connection():
-    conn = None
-    try:
-        conn = get_conn()
+    with pooled_conn() as conn:
         yield conn
-    finally:
-        if conn:
-            conn.close()
 
-def safe_dataframe(rows, table: str):
+def query_df(conn, sql, params=()):
+    """Read a query straight into an Arrow-backed DataFrame; columns come from the query"""
+    return pd.read_sql_query(sql, conn, params=params, dtype_backend="pyarrow")
+
+def empty_dataframe(table: str):
+    """Empty frame with the table's columns, used when a read fails"""
     try:
-        if rows:
-            return pd.DataFrame(rows, columns=rows[0].keys())
-        cols = get_columns(table)
-        return pd.DataFrame([], columns=cols)
+        return pd.DataFrame([], columns=get_columns(table))
     except Exception:
         return pd.DataFrame([])
 
@@ -42,47 +43,68 @@ ASSIGNMENT_COLORS = {
     'sealed_subuser': {'bg': '#c5cae9', 'text': '#283593', 'border': '#3f51b5'}, # Light indigo - sealed, subuser level
 }
 
+# Issued/sealed colors depend on whether the HDD is with a subuser: (status, with_subuser, colors)
+ASSIGNMENT_STATUS_COLORS = [
+    ('issued', True, {'bg': '#fff3cd', 'text': '#856404', 'border': '#ffc107'}),   # Issued to subuser - bright yellow/amber
+    ('issued', False, {'bg': '#fff8e1', 'text': '#f57f17', 'border': '#ffb300'}),  # Issued to user only - light amber
+    ('sealed', True, {'bg': '#bbdefb', 'text': '#0d47a1', 'border': '#1976d2'}),   # Sealed with subuser - deep blue
+    ('sealed', False, {'bg': '#e3f2fd', 'text': '#1565c0', 'border': '#42a5f5'}),  # Sealed user only - light blue
+]
+
+DEFAULT_STATUS_COLORS = {'bg': 'white', 'text': 'black', 'border': '#ddd'}
+
+def _row_css(status, with_subuser):
+    """CSS for one row of the given status and assignment"""
+    colors = next((c for name, sub, c in ASSIGNMENT_STATUS_COLORS if name == status and sub == with_subuser),
+                  STATUS_COLORS.get(status, DEFAULT_STATUS_COLORS))
+    # Thick left border and bold text mark HDDs assigned to subusers
+    border = f"3px solid {colors.get('border', '#ddd')}" if with_subuser else ""
+    weight = "600" if with_subuser else "400"
+    return f"background-color: {colors['bg']}; color: {colors['text']}; border-left: {border}; font-weight: {weight}"
+
+# Statuses as small integer codes; the extra last code covers unknown statuses
+STATUS_CODES = {name: i for i, name in enumerate(STATUS_COLORS)}
+# Row CSS indexed by [status code, with_subuser]
+_ROW_CSS = np.array([[_row_css(status, sub) for sub in (False, True)] for status in [*STATUS_COLORS, None]],
+                    dtype=object)
+
+def _has_subuser(subusers):
+    """Rows with a non-blank assigned_subuser; blanks are checked once per distinct name"""
+    subusers = subusers.astype('category')
+    named = np.asarray(subusers.cat.categories.astype(str).str.strip() != '', dtype=bool)
+    # NULLs have code -1, which picks the trailing False
+    return np.append(named, False)[subusers.cat.codes.to_numpy()]
+
+def _build_style_matrix(df):
+    """CSS for every cell: one table lookup per row, broadcast across columns"""
+    codes = df['status'].map(STATUS_CODES).fillna(len(STATUS_COLORS)).to_numpy(dtype=int)
+    if 'assigned_subuser' in df.columns:
+        with_subuser = _has_subuser(df['assigned_subuser']).astype(int)
+    else:
+        with_subuser = np.zeros(len(df), dtype=int)
+
+    css = _ROW_CSS[codes, with_subuser]
+    return pd.DataFrame(np.broadcast_to(css[:, None], df.shape), index=df.index, columns=df.columns)
+
 def style_status_dataframe(df):
     """Apply color styling to dataframe based on status and assignment"""
     if df.empty or 'status' not in df.columns:
         return df
+    return df.style.apply(_build_style_matrix, axis=None)
 
-    def highlight_row(row):
-        status = row.get('status', '')
-        assigned_subuser = row.get('assigned_subuser', None)
+# Rows per page in the status tables; only the visible page is styled and sent
+STATUS_TABLE_PAGE_SIZE = 50
 
-        # Determine color based on status and assignment
-        if status == 'issued':
-            if assigned_subuser and assigned_subuser.strip():
-                # Issued to subuser - bright yellow/amber
-                colors = {'bg': '#fff3cd', 'text': '#856404', 'border': '#ffc107'}
-            else:
-                # Issued to user only - light amber
-                colors = {'bg': '#fff8e1', 'text': '#f57f17', 'border': '#ffb300'}
-        elif status == 'sealed':
-            if assigned_subuser and assigned_subuser.strip():
-                # Sealed with subuser - deep blue
-                colors = {'bg': '#bbdefb', 'text': '#0d47a1', 'border': '#1976d2'}
-            else:
-                # Sealed user only - light blue
-                colors = {'bg': '#e3f2fd', 'text': '#1565c0', 'border': '#42a5f5'}
-        else:
-            # Other statuses use default colors
-            colors = STATUS_COLORS.get(status, {'bg': 'white', 'text': 'black', 'border': '#ddd'})
-            if 'border' not in colors:
-                colors['border'] = '#ddd'
-
-        # Add border for assigned subusers
-        border_style = f"3px solid {colors.get('border', '#ddd')}" if assigned_subuser and assigned_subuser.strip() else ""
-
-        return [f"background-color: {colors['bg']}; color: {colors['text']}; border-left: {border_style}; font-weight: {'600' if assigned_subuser and assigned_subuser.strip() else '400'}" for _ in row]
-
-    styled = df.style.apply(highlight_row, axis=1)
-    return styled
+def render_status_table(df, height=400):
+    """Show a read-only, status-colored table one page at a time"""
+    total_pages = max(1, -(-len(df) // STATUS_TABLE_PAGE_SIZE))
+    page = st.number_input("Page", min_value=1, max_value=total_pages, value=1, step=1) if total_pages > 1 else 1
+    start = (page - 1) * STATUS_TABLE_PAGE_SIZE
+    st.dataframe(style_status_dataframe(df.iloc[start:start + STATUS_TABLE_PAGE_SIZE]),
+                 use_container_width=True, height=height)
+    st.caption(f"Page {page} of {total_pages} · {len(df)} HDDs")
 
-def render_status_legend():
-    """Render status color legend with assignment indicators"""
-    st.markdown("""
+_LEGEND_HTML = """
     <div style="margin-bottom: 15px;">
         <div style="display: flex; gap: 10px; flex-wrap: wrap; margin-bottom: 8px; padding: 10px; background: #f8f9fa; border-radius: 8px;">
             <div style="font-weight: 600; color: #333; width: 100%; margin-bottom: 5px;">Status Colors:</div>
@@ -98,47 +120,67 @@ def render_status_legend():
             <strong>💡 Tip:</strong> Rows with <strong>thick colored left border</strong> and <strong>bold text</strong> indicate HDDs assigned to subusers
         </div>
     </div>
-    """, unsafe_allow_html=True)
-def get_subusers_with_hdd(parent_user):
-    """Get set of subuser usernames that have HDDs assigned"""
-    try:
-        with db_connection() as conn:
-            c = conn.cursor()
-            assigned = c.execute("""
-                SELECT DISTINCT assigned_subuser FROM hdd_records 
-                WHERE team_code=? AND assigned_subuser IS NOT NULL AND assigned_subuser != ''
-            """, (parent_user,)).fetchall()
-            return {a['assigned_subuser'] for a in assigned}
-    except:
-        return set()
-
-def format_subuser_list_with_hdd_status(subusers, parent_user):
-    """Format subuser list with color indicators for HDD assignment status"""
-    subusers_with_hdd = get_subusers_with_hdd(parent_user)
-    
-    formatted_list = []
-    for s in subusers:
-        uname = s['username']
-        if uname in subusers_with_hdd:
-            formatted_list.append(f"🔴 {uname} (has HDD)")
-        else:
-            formatted_list.append(f"🟢 {uname}")
-    
-    return formatted_list
-
-def extract_username_from_selection(selection):
-    """Extract actual username from formatted selection string"""
-    if not selection or selection == "":
-        return None
-    # Remove emoji and status indicator
-    if selection.startswith("🔴 ") or selection.startswith("🟢 "):
-        uname = selection[2:].strip()  # Remove emoji
-        if " (has HDD)" in uname:
-            uname = uname.replace(" (has HDD)", "")
-        return uname
-    return selection
-
-def render_my_hdds_tab(user):
+    """
+
+def render_status_legend():
+    """Render status color legend with assignment indicators"""
+    st.markdown(_LEGEND_HTML, unsafe_allow_html=True)
+
+# Columns loaded for the panel; data_details is fetched per HDD when viewed
+PANEL_COLUMNS = ['id', 'serial_no', 'unit_space', 'team_code', 'assigned_subuser', 'premise_name',
+                 'date_search', 'date_seized', 'status', 'created_by', 'created_on', 'barcode_value']
+
+# Columns shown in the View Data table
+VIEW_DATA_COLUMNS = ['id', 'serial_no', 'unit_space', 'assigned_subuser', 'premise_name',
+                     'date_search', 'date_seized', 'status']
+
+def _panel_data(hdds, subusers=()):
+    """Derive the per-tab views and status counts from the team's hdd_records frame and subuser list"""
+    # Few distinct subusers per team, so store them as a categorical
+    hdds = hdds.assign(assigned_subuser=hdds['assigned_subuser'].astype('category'))
+    has_subuser = _has_subuser(hdds['assigned_subuser'])
+    # Metric card totals as {status: (count, with_subuser)}, using the same subuser rule as the table styling
+    totals = hdds['status'].value_counts(dropna=False)
+    with_subuser = hdds.loc[has_subuser, 'status'].value_counts(dropna=False)
+    return {
+        'hdds': hdds,
+        'subusers': list(subusers),
+        'status_counts': {status: (int(n), int(with_subuser.get(status, 0))) for status, n in totals.items()},
+        'issued': hdds[hdds['status'] == 'issued'],
+        'sealed': hdds[hdds['status'] == 'sealed'],
+        'subusers_with_hdd': set(hdds.loc[has_subuser, 'assigned_subuser']),
+    }
+
+# Read-only lookups are cached briefly; the assign/seal/create branches clear
+# the affected cache after committing.
+@st.cache_data(ttl=10, show_spinner=False)
+def _load_panel_data(user):
+    """Fetch this team's HDDs and subusers once per panel render and slice them per tab"""
+    with db_connection() as conn:
+        c = conn.cursor()
+        # One read transaction, so both lists come from the same snapshot
+        c.execute("BEGIN")
+        try:
+            hdds = query_df(conn, f"SELECT {', '.join(PANEL_COLUMNS)} FROM hdd_records WHERE team_code=? ORDER BY id DESC",
+                            (user,))
+            # Subusers as (username, valid_till) tuples, newest first
+            subusers = c.execute("""
+                SELECT username, valid_till FROM users 
+                WHERE role='subuser' AND parent_user=?
+                ORDER BY id DESC
+            """, (user,)).fetchall()
+        finally:
+            conn.commit()
+    return _panel_data(hdds, [tuple(s) for s in subusers])
+
+@st.cache_data(ttl=15, show_spinner=False)
+def format_subuser_list_with_hdd_status(subusers, subusers_with_hdd):
+    """Map each subuser to a label with a color indicator for HDD assignment status"""
+    names = pd.Series(list(subusers), dtype=object)
+    has_hdd = names.isin(subusers_with_hdd).to_numpy()
+    return dict(zip(subusers, np.where(has_hdd, "🔴 " + names + " (has HDD)", "🟢 " + names).tolist()))
+
+def render_my_hdds_tab(user, data):
     """View HDDs assigned by admin to this user"""
     st.subheader("💿 My Assigned HDDs")
     # Status legend
@@ -149,52 +191,36 @@ def render_my_hdds_tab(user):
         status_filter = st.selectbox("Filter", ["All", "issued", "sealed"])
     with col2:
         if st.button("🔄 Refresh", use_container_width=True):
+            _load_panel_data.clear()
             st.rerun()
     
-    try:
-        with db_connection() as conn:
-            c = conn.cursor()
-            query = "SELECT * FROM hdd_records WHERE team_code=?"
-            params = [user]
-            
-            if status_filter != "All":
-                query += " AND status=?"
-                params.append(status_filter)
-            
-            query += " ORDER BY id DESC"
-            rows = c.execute(query, tuple(params)).fetchall()
-    except Exception as e:
-        st.error(f"❌ Database error: {e}")
-        rows = []
-    
-    df = safe_dataframe(rows, "hdd_records")
+    df = data['hdds'] if status_filter == "All" else data[status_filter]
 
     if not df.empty:
         # Status metrics
         col1, col2, col3, col4 = st.columns(4)
 
-        # Calculate assignments
-        assigned_to_subuser = len(df[(df['assigned_subuser'].notna()) & (df['assigned_subuser'] != '')]) if 'assigned_subuser' in df.columns else 0
+        # Counts are computed once per snapshot in _panel_data
+        counts = data['status_counts']
+        if status_filter != "All":
+            counts = {status_filter: counts.get(status_filter, (0, 0))}
 
         with col1:
-            st.metric("📊 Total HDDs", len(df))
+            st.metric("📊 Total HDDs", sum(n for n, _ in counts.values()))
         with col2:
-            issued = len(df[df['status'] == 'issued']) if 'status' in df.columns else 0
-            st.metric("🟡 Issued", issued)
+            st.metric("🟡 Issued", counts.get('issued', (0, 0))[0])
         with col3:
-            sealed = len(df[df['status'] == 'sealed']) if 'status' in df.columns else 0
-            st.metric("🔵 Sealed", sealed)
+            st.metric("🔵 Sealed", counts.get('sealed', (0, 0))[0])
         with col4:
-            st.metric("👥 With Subuser", assigned_to_subuser)
+            st.metric("👥 With Subuser", sum(sub for _, sub in counts.values()))
 
-        # Color-coded dataframe
-        styled_df = style_status_dataframe(df)
-        st.dataframe(styled_df, use_container_width=True, height=400)
+        # Color-coded dataframe, one page at a time
+        render_status_table(df)
     else:
         st.info("🔭 No HDDs assigned yet")
 
-def render_assign_to_subuser_tab(user):
-    """User assigns HDD to subuser"""
+def render_assign_to_subuser_tab(user, data):
+    """User assigns one or more HDDs to a subuser"""
     st.subheader("📤 Assign HDD to Subuser")
     
     with st.form("assign_subuser_form", clear_on_submit=True):
@@ -202,84 +228,71 @@ def render_assign_to_subuser_tab(user):
         
         with col1:
             # Get user's HDDs with issued status
-            try:
-                with db_connection() as conn:
-                    c = conn.cursor()
-                    hdds = c.execute("""
-                        SELECT serial_no, unit_space FROM hdd_records 
-                        WHERE team_code=? AND status='issued'
-                    """, (user,)).fetchall()
-                    hdd_list = [f"{h['serial_no']} - {h['unit_space']}" for h in hdds]
-            except:
-                hdd_list = []
+            issued = data['issued']
+            # Options are serial numbers; the label is only for display
+            hdd_labels = {sn: f"{sn} - {us}" for sn, us in zip(issued['serial_no'], issued['unit_space'])}
             
-            selected_hdd = st.selectbox("Select HDD", hdd_list if hdd_list else [""])
+            selected_hdds = st.multiselect("Select HDDs", list(hdd_labels), format_func=hdd_labels.get)
         
         with col2:
             # Get subusers under this user with HDD status
-            try:
-                with db_connection() as conn:
-                    c = conn.cursor()
-                    subusers = c.execute("""
-                        SELECT username FROM users 
-                        WHERE role='subuser' AND parent_user=?
-                    """, (user,)).fetchall()
-                    subuser_list = format_subuser_list_with_hdd_status(subusers, user)
-            except:
-                subuser_list = []
+            subusers = [uname for uname, _ in data['subusers']]
+            subuser_labels = format_subuser_list_with_hdd_status(tuple(subusers), tuple(sorted(data['subusers_with_hdd'])))
             
-            subuser_selection = st.selectbox("Assign to Subuser", subuser_list if subuser_list else [""])
+            subuser = st.selectbox("Assign to Subuser", list(subuser_labels), format_func=subuser_labels.get)
             st.caption("🟢 = Available | 🔴 = Already has HDD")
         
         notes = st.text_area("Assignment Notes", placeholder="Instructions for subuser...")
         
         if st.form_submit_button("📤 Assign to Subuser", use_container_width=True):
-            subuser = extract_username_from_selection(subuser_selection)
-            if not selected_hdd or not subuser:
+            if not selected_hdds or not subuser:
                 st.error("⚠️ Select HDD and Subuser")
             else:
                 try:
-                    serial_no = selected_hdd.split(" - ")[0]
+                    # All selected HDDs are assigned in one transaction, or none are
                     with db_connection() as conn:
                         c = conn.cursor()
-                        now = datetime.utcnow().isoformat()
-                        update_note = f"\n[ASSIGNED TO SUBUSER {now} by {user} to {subuser}]: {notes}"
-                        c.execute("""
-                            UPDATE hdd_records 
-                            SET assigned_subuser=?, data_details=COALESCE(data_details, '') || ?
+                        # Take the write lock up front rather than at the first UPDATE
+                        c.execute("BEGIN IMMEDIATE")
+                        c.executemany("""
+                            UPDATE hdd_records SET assigned_subuser=?
                             WHERE serial_no=? AND team_code=?
-                        """, (subuser, update_note, serial_no, user))
+                        """, [(subuser, sn, user) for sn in selected_hdds])
+                        if c.rowcount != len(selected_hdds):
+                            raise ValueError("Some selected HDDs are no longer issued to your team")
+                        # Audit timestamp comes from SQLite (UTC, ISO format)
+                        c.executemany("""
+                            INSERT INTO hdd_audit (serial_no, team_code, action, actor, target, ts, notes)
+                            VALUES (?, ?, 'assign_subuser', ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now'), ?)
+                        """, [(sn, user, user, subuser, notes) for sn in selected_hdds])
                         conn.commit()
-                    st.success(f"✅ HDD {serial_no} assigned to {subuser}")
-                    log_action(user, f"assign_subuser:{serial_no}:{subuser}")
+                    _load_panel_data.clear()
+                    # Subusers' Enter Data lists must drop reassigned or sealed HDDs straight away
+                    get_assigned_hdds.clear()
+                    st.success(f"✅ {len(selected_hdds)} HDD(s) assigned to {subuser}")
+                    for sn in selected_hdds:
+                        log_action(user, f"assign_subuser:{sn}:{subuser}")
                     st.rerun()
                 except Exception as e:
                     st.error(f"❌ Error: {e}")
 
-def render_mark_sealed_tab(user):
+def render_mark_sealed_tab(user, data):
     """User marks HDD as sealed when received from subuser"""
     st.subheader("🔒 Mark HDD as Sealed")
     
     st.info("ℹ️ Mark HDD as sealed when data entry is complete and received from subuser")
     
     # Get HDDs that can be sealed (issued status)
-    try:
-        with db_connection() as conn:
-            c = conn.cursor()
-            hdds = c.execute("""
-                SELECT serial_no, unit_space, assigned_subuser FROM hdd_records 
-                WHERE team_code=? AND status='issued'
-            """, (user,)).fetchall()
-            hdd_list = [f"{h['serial_no']} - {h['unit_space']} (assigned to: {h['assigned_subuser'] or 'none'})" for h in hdds]
-    except:
-        hdd_list = []
+    issued = data['issued']
+    hdd_labels = {sn: f"{sn} - {us} (assigned to: {sub if isinstance(sub, str) and sub else 'none'})"
+                  for sn, us, sub in zip(issued['serial_no'], issued['unit_space'], issued['assigned_subuser'])}
     
-    if not hdd_list:
+    if not hdd_labels:
         st.warning("⚠️ No HDDs available to seal")
         return
     
     with st.form("seal_hdd_form", clear_on_submit=True):
-        selected_hdd = st.selectbox("Select HDD", hdd_list)
+        selected_hdd = st.selectbox("Select HDD", list(hdd_labels), format_func=hdd_labels.get)
         seal_notes = st.text_area("Sealing Notes", placeholder="Confirm data entry complete, ready for extraction...")
         
         if st.form_submit_button("🔒 Mark as Sealed", use_container_width=True):
@@ -287,27 +300,32 @@ def render_mark_sealed_tab(user):
                 st.error("⚠️ Select an HDD")
             else:
                 try:
-                    serial_no = selected_hdd.split(" - ")[0]
+                    serial_no = selected_hdd
                     
                     with db_connection() as conn:
                         c = conn.cursor()
-                        now = datetime.utcnow().isoformat()
-                        seal_note = f"\n[SEALED {now} by {user}]: {seal_notes}"
-                        
+                        c.execute("BEGIN IMMEDIATE")
                         c.execute("""
-                            UPDATE hdd_records 
-                            SET status='sealed', data_details=COALESCE(data_details, '') || ?
+                            UPDATE hdd_records SET status='sealed'
                             WHERE serial_no=? AND team_code=?
-                        """, (seal_note, serial_no, user))
+                        """, (serial_no, user))
+                        if c.rowcount == 0:
+                            raise ValueError(f"HDD {serial_no} is not issued to your team")
+                        c.execute("""
+                            INSERT INTO hdd_audit (serial_no, team_code, action, actor, ts, notes)
+                            VALUES (?, ?, 'seal', ?, strftime('%Y-%m-%dT%H:%M:%f', 'now'), ?)
+                        """, (serial_no, user, user, seal_notes))
                         conn.commit()
                     
+                    _load_panel_data.clear()
+                    get_assigned_hdds.clear()
                     st.success(f"✅ HDD {serial_no} marked as sealed")
                     log_action(user, f"seal_hdd:{serial_no}")
                     st.rerun()
                 except Exception as e:
                     st.error(f"❌ Error: {e}")
 
-def render_view_data_tab(user):
+def render_view_data_tab(user, data):
     """User views data entered by subusers (read-only)"""
     st.subheader("👁️ View Data Entered by Subusers")
     
@@ -316,29 +334,15 @@ def render_view_data_tab(user):
     # Status legend
     render_status_legend()
     
-    try:
-        with db_connection() as conn:
-            c = conn.cursor()
-            rows = c.execute("""
-                SELECT serial_no, unit_space, assigned_subuser, premise_name, 
-                       date_search, date_seized, data_details, status 
-                FROM hdd_records 
-                WHERE team_code=?
-                ORDER BY id DESC
-            """, (user,)).fetchall()
-    except Exception as e:
-        st.error(f"❌ Database error: {e}")
-        rows = []
-    
-    df = safe_dataframe(rows, "hdd_records")
+    df = data['hdds'][VIEW_DATA_COLUMNS]
     
     if not df.empty:
         # Status metrics
         col1, col2, col3, col4 = st.columns(4)
-        status_counts = df['status'].value_counts().to_dict() if 'status' in df.columns else {}
+        status_counts = {status: n for status, (n, _) in data['status_counts'].items()}
         
         with col1:
-            st.metric("📊 Total", len(df))
+            st.metric("📊 Total", sum(status_counts.values()))
         with col2:
             st.metric("🟡 Issued", status_counts.get('issued', 0))
         with col3:
@@ -347,16 +351,15 @@ def render_view_data_tab(user):
             st.metric("🔴 In Extraction", status_counts.get('in_extraction', 0))
         
         # Filter by subuser
-        subusers = df['assigned_subuser'].unique() if 'assigned_subuser' in df.columns else []
+        subusers = df['assigned_subuser'].cat.categories if 'assigned_subuser' in df.columns else []
         selected_subuser = st.selectbox("Filter by Subuser", ["All"] + [s for s in subusers if s])
         
         filtered_df = df.copy()
         if selected_subuser != "All":
             filtered_df = df[df['assigned_subuser'] == selected_subuser]
         
-        # Color-coded dataframe
-        styled_df = style_status_dataframe(filtered_df)
-        st.dataframe(styled_df, use_container_width=True, height=400)
+        # Color-coded dataframe, one page at a time
+        render_status_table(filtered_df)
         
         # Show detailed view
         if not filtered_df.empty:
@@ -366,7 +369,8 @@ def render_view_data_tab(user):
             selected = st.selectbox("Select HDD for details", serial_nos)
             
             if selected:
-                detail = filtered_df[filtered_df['serial_no'] == selected].iloc[0]
+                # Arrow columns hold NA for NULLs; blank them like the None they replace
+                detail = filtered_df[filtered_df['serial_no'] == selected].iloc[0].fillna('')
                 
                 # Status badge
                 status = detail['status']
@@ -390,37 +394,37 @@ def render_view_data_tab(user):
                     st.text_input("Assigned to", value=str(detail['assigned_subuser'] or ''), disabled=True)
                     st.text_input("Seized Date", value=str(detail['date_seized'] or ''), disabled=True)
                 
-                st.text_area("Data Details", value=str(detail['data_details'] or ''), height=200, disabled=True)
+                try:
+                    with db_connection() as conn:
+                        c = conn.cursor()
+                        legacy = c.execute("SELECT data_details FROM hdd_records WHERE id=? AND team_code=?",
+                                           (int(detail['id']), user)).fetchone()
+                        details = format_data_details(get_data_entries(c, int(detail['id'])),
+                                                      legacy and legacy['data_details'], get_hdd_audit(c, selected))
+                except sqlite3.Error as e:
+                    warn_db_error(e, user)
+                    details = ''
+                st.text_area("Data Details", value=details, height=200, disabled=True)
     else:
         st.info("🔭 No records found")
 
-def render_create_subuser_tab(user):
+def render_create_subuser_tab(user, data):
     """User creates subusers (7-day expiry)"""
     st.subheader("👤 Create Subuser")
     
     st.info("ℹ️ Create temporary subusers for data entry. Auto-expires in 7 days.")
     
     # Show existing subusers with HDD status
-    try:
-        with db_connection() as conn:
-            c = conn.cursor()
-            subusers = c.execute("""
-                SELECT username, valid_till FROM users 
-                WHERE role='subuser' AND parent_user=?
-                ORDER BY id DESC
-            """, (user,)).fetchall()
-    except:
-        subusers = []
+    subusers = data['subusers']
     
     if subusers:
         # Add HDD status column to dataframe
-        subusers_with_hdd = get_subusers_with_hdd(user)
         df_data = []
-        for s in subusers:
-            has_hdd = "🔴 Yes" if s['username'] in subusers_with_hdd else "🟢 No"
+        for uname, valid_till in subusers:
+            has_hdd = "🔴 Yes" if uname in data['subusers_with_hdd'] else "🟢 No"
             df_data.append({
-                "Username": s['username'],
-                "Valid Till": s['valid_till'],
+                "Username": uname,
+                "Valid Till": valid_till,
                 "Has HDD": has_hdd
             })
         df = pd.DataFrame(df_data)
@@ -447,45 +451,67 @@ def render_create_subuser_tab(user):
                 try:
                     with db_connection() as conn:
                         c = conn.cursor()
-                        valid_till = (datetime.utcnow() + timedelta(days=7)).isoformat()
-                        pw_hash = hash_password(password)
-                        
-                        c.execute("""
-                            INSERT INTO users(username, password_hash, role, approved, valid_till, parent_user) 
-                            VALUES (?,?,?,1,?,?)
-                        """, (subuser_name, pw_hash, 'subuser', valid_till, user))
-                        conn.commit()
+                        # Hashes are salted, so rule out a taken name before paying for the KDF;
+                        # the UNIQUE constraint still catches a concurrent insert
+                        taken = c.execute("SELECT 1 FROM users WHERE username=? LIMIT 1", (subuser_name,)).fetchone()
+                        if not taken:
+                            valid_till = (utcnow() + timedelta(days=7)).isoformat()
+                            pw_hash = hash_password(password)
+                            
+                            c.execute("""
+                                INSERT INTO users(username, password_hash, role, approved, valid_till, parent_user) 
+                                VALUES (?,?,?,1,?,?)
+                            """, (subuser_name, pw_hash, 'subuser', valid_till, user))
+                            conn.commit()
                     
-                    st.success(f"✅ Subuser {subuser_name} created (expires {valid_till[:10]})")
-                    log_action(user, f"create_subuser:{subuser_name}")
-                    st.rerun()
+                    if taken:
+                        st.error("❌ Username already exists")
+                    else:
+                        _load_panel_data.clear()
+                        st.success(f"✅ Subuser {subuser_name} created (expires {valid_till[:10]})")
+                        log_action(user, f"create_subuser:{subuser_name}")
+                        st.rerun()
                 except Exception as e:
                     if 'unique' in str(e).lower():
                         st.error("❌ Username already exists")
                     else:
                         st.error(f"❌ Error: {e}")
 
-def render_extraction_status_tab(user):
+def _rows_frame(groups, table):
+    """Arrow-backed frame of table rows grouped by id, newest first"""
+    df = pd.DataFrame([tuple(row) for rows in groups.values() for row in rows], columns=get_columns(table))
+    return df.convert_dtypes(dtype_backend="pyarrow").sort_values('id', ascending=False, ignore_index=True)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_extraction_status(user, serials):
+    """Extraction and analysis frames for the given team serials, newest first"""
+    # Filter by this team's serials instead of joining against hdd_records
+    with db_connection() as conn:
+        c = conn.cursor()
+        extractions = _rows_frame(group_in_batches(
+            c, "SELECT * FROM extraction_records WHERE original_hdd_sn IN ({placeholders})",
+            'id', serials), "extraction_records")
+        extracted_sns = set(extractions['extracted_hdd_sn'].dropna()) - {''}
+        analysis = _rows_frame(group_in_batches(
+            c, "SELECT * FROM analysis_records WHERE extracted_hdd_sn IN ({placeholders})",
+            'id', extracted_sns), "analysis_records")
+    return extractions, analysis
+
+def render_extraction_status_tab(user, data):
     """View extraction and analysis status"""
     st.subheader("🔍 Extraction & Analysis Status")
     
     tab1, tab2 = st.tabs(["📤 Extractions", "📊 Analysis"])
     
+    try:
+        extractions_df, analysis_df = _load_extraction_status(user, tuple(data['hdds']['serial_no']))
+    except sqlite3.Error as e:
+        warn_db_error(e, user)
+        extractions_df = empty_dataframe("extraction_records")
+        analysis_df = empty_dataframe("analysis_records")
+    
     with tab1:
-        try:
-            with db_connection() as conn:
-                c = conn.cursor()
-                extractions = c.execute("""
-                    SELECT e.* 
-                    FROM extraction_records e
-                    JOIN hdd_records h ON e.original_hdd_sn = h.serial_no
-                    WHERE h.team_code=?
-                    ORDER BY e.id DESC
-                """, (user,)).fetchall()
-        except:
-            extractions = []
-        
-        df = safe_dataframe(extractions, "extraction_records")
+        df = extractions_df
         if not df.empty:
             st.caption(f"📊 Total: {len(df)} records")
             st.dataframe(df, use_container_width=True, height=300)
@@ -493,21 +519,7 @@ def render_extraction_status_tab(user):
             st.info("📭 No extraction records")
     
     with tab2:
-        try:
-            with db_connection() as conn:
-                c = conn.cursor()
-                analysis = c.execute("""
-                    SELECT a.* 
-                    FROM analysis_records a
-                    JOIN extraction_records e ON a.extracted_hdd_sn = e.extracted_hdd_sn
-                    JOIN hdd_records h ON e.original_hdd_sn = h.serial_no
-                    WHERE h.team_code=?
-                    ORDER BY a.id DESC
-                """, (user,)).fetchall()
-        except:
-            analysis = []
-        
-        df = safe_dataframe(analysis, "analysis_records")
+        df = analysis_df
         if not df.empty:
             st.caption(f"📊 Total: {len(df)} records")
             st.dataframe(df, use_container_width=True, height=300)
@@ -519,29 +531,17 @@ def user_panel(user):
     st.header(f"👤 {user} (Conducting Team)")
     st.caption(f"Logged in as: {user}")
     
-    tabs = st.tabs([
-        "💿 My HDDs", 
-        "📤 Assign to Subuser",
-        "🔒 Mark Sealed",
-        "👁️ View Data",
-        "👤 Create Subuser",
-        "🔍 Status"
-    ])
-    
-    with tabs[0]:
-        render_my_hdds_tab(user)
-    
-    with tabs[1]:
-        render_assign_to_subuser_tab(user)
-    
-    with tabs[2]:
-        render_mark_sealed_tab(user)
-    
-    with tabs[3]:
-        render_view_data_tab(user)
-    
-    with tabs[4]:
-        render_create_subuser_tab(user)
+    try:
+        data = _load_panel_data(user)
+    except Exception as e:
+        st.error(f"❌ Database error: {e}")
+        data = _panel_data(empty_dataframe("hdd_records"))
     
-    with tabs[5]:
-        render_extraction_status_tab(user)
\ No newline at end of file
+    render_open_tab("user_panel_tab", {
+        "💿 My HDDs": render_my_hdds_tab,
+        "📤 Assign to Subuser": render_assign_to_subuser_tab,
+        "🔒 Mark Sealed": render_mark_sealed_tab,
+        "👁️ View Data": render_view_data_tab,
+        "👤 Create Subuser": render_create_subuser_tab,
+        "🔍 Status": render_extraction_status_tab,
+    }, user, data)
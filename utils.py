@@ -1,48 +1,212 @@
-import os, hashlib
-from db import get_conn
-from datetime import datetime, timedelta
+import os, sys, hashlib, hmac, atexit, queue, threading, time
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from db import pooled_conn
+from datetime import datetime, timedelta, timezone
+
+try:
+    from argon2.low_level import Type, hash_secret_raw
+except ImportError:  # argon2-cffi not installed; new hashes stay on PBKDF2
+    hash_secret_raw = None
+
+# Both KDFs release the GIL while hashing, so a thread pool lets
+# concurrent logins verify passwords on separate cores.
+_HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='pwhash')
+
+def utcnow() -> datetime:
+    """Current UTC time as a naive datetime, matching the stored ISO timestamps"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+PBKDF2_ITERATIONS = 100_000
+
+def _derive_key(password: str, salt: bytes) -> bytes:
+    # hashlib's PBKDF2 is OpenSSL's, which already uses the CPU's SHA
+    # extensions where available
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, PBKDF2_ITERATIONS)
+
+# Argon2id hashes are stored as 'argon2$salt_hex:dk_hex'; unprefixed ones are PBKDF2
+ARGON2_PREFIX = 'argon2$'
+
+def _derive_key_argon2(password: str, salt: bytes) -> bytes:
+    return hash_secret_raw(password.encode('utf-8'), salt, time_cost=2, memory_cost=19456,
+                           parallelism=1, hash_len=32, type=Type.ID)
 
 def hash_password(password: str, salt: bytes = None) -> str:
     if salt is None:
         salt = os.urandom(16)
-    dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100_000)
-    return salt.hex() + ":" + dk.hex()
+    if hash_secret_raw is not None:
+        return ARGON2_PREFIX + salt.hex() + ":" + _derive_key_argon2(password, salt).hex()
+    return salt.hex() + ":" + _derive_key(password, salt).hex()
 
 def check_password(password: str, stored: str) -> bool:
     try:
-        salt_hex, dk_hex = stored.split(":")
-        salt = bytes.fromhex(salt_hex)
-        new_dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100_000).hex()
-        return new_dk == dk_hex
+        if stored.startswith(ARGON2_PREFIX):
+            derive, stored = _derive_key_argon2, stored[len(ARGON2_PREFIX):]
+        else:
+            derive = _derive_key
+        salt_hex, _, dk_hex = stored.partition(":")
+        expected = bytes.fromhex(dk_hex)
+        # Constant-time compare, so response time doesn't leak how much of the key matched
+        return bool(expected) and hmac.compare_digest(derive(password, bytes.fromhex(salt_hex)), expected)
     except Exception:
         return False
 
+def submit_check_password(password: str, stored: str):
+    """Start check_password on the hash pool; returns a Future[bool]"""
+    return _HASH_POOL.submit(check_password, password, stored)
+
 def create_user(username: str, password: str, role: str = 'user', approved: int = 0, valid_till: str = None, password_expiry: str = None):
-    conn = get_conn(); c = conn.cursor()
     pw_hash = hash_password(password)
-    c.execute('INSERT INTO users(username, password_hash, role, approved, valid_till, password_expiry) VALUES (?,?,?,?,?,?)',
-              (username, pw_hash, role, approved, valid_till, password_expiry))
-    conn.commit(); conn.close()
+    with pooled_conn() as conn:
+        conn.execute('INSERT INTO users(username, password_hash, role, approved, valid_till, password_expiry) VALUES (?,?,?,?,?,?)',
+                     (username, pw_hash, role, approved, valid_till, password_expiry))
+        conn.commit()
 
 def get_user(username: str):
-    conn = get_conn(); c = conn.cursor()
-    row = c.execute('SELECT * FROM users WHERE username=?', (username,)).fetchone()
-    conn.close()
-    return row
+    with pooled_conn() as conn:
+        return conn.execute('SELECT * FROM users WHERE username=?', (username,)).fetchone()
+
+# Log rows are queued by log_action and written in batches by a background
+# thread, so request paths never wait on the logs INSERT/commit.
+LOG_BATCH_SIZE = 128
+LOG_FLUSH_INTERVAL = 0.1
+_LOG_Q = queue.Queue()
+_LOG_LOCK = threading.Lock()
+
+def _flush_logs() -> int:
+    with _LOG_LOCK:
+        batch = []
+        try:
+            while len(batch) < LOG_BATCH_SIZE:
+                batch.append(_LOG_Q.get_nowait())
+        except queue.Empty:
+            pass
+        if batch:
+            # Queued times are epoch seconds; stored as naive UTC ISO strings like utcnow()
+            rows = [(u, a, datetime.fromtimestamp(t, timezone.utc).replace(tzinfo=None).isoformat())
+                    for u, a, t in batch]
+            try:
+                with pooled_conn() as conn:
+                    conn.executemany('INSERT INTO logs(username, action, ts) VALUES (?,?,?)', rows)
+                    conn.commit()
+            except Exception:
+                # Put the batch back so the next flush retries it instead of dropping it
+                for item in batch:
+                    _LOG_Q.put(item)
+                raise
+        return len(batch)
+
+def _drain_logs():
+    while _flush_logs():
+        pass
+
+def _log_writer():
+    while True:
+        time.sleep(LOG_FLUSH_INTERVAL)
+        try:
+            _drain_logs()
+        except Exception as e:
+            print(f"log writer: flush failed, will retry: {e!r}", file=sys.stderr)
+
+threading.Thread(target=_log_writer, name='log-writer', daemon=True).start()
+atexit.register(_drain_logs)
 
 def log_action(username: str, action: str):
-    conn = get_conn(); c = conn.cursor()
-    c.execute('INSERT INTO logs(username, action, ts) VALUES (?,?,?)', (username, action, datetime.utcnow().isoformat()))
-    conn.commit(); conn.close()
+    _LOG_Q.put((username, action, time.time()))
+
+def warn_db_error(e, user=None):
+    """Log a failed read and surface it rather than rendering an empty section"""
+    log_action(user or st.session_state.get("user"), f"db_err:{e!r}")
+    st.warning(f"⚠️ Database unavailable, please retry: {e}")
+
+def render_open_tab(key, renderers, *args):
+    """Show the renderers' labels as tabs and run only the open tab's renderer with args.
+
+    Selecting a tab reruns the script, so the closed tabs' queries never execute.
+    """
+    tabs = st.tabs(list(renderers), key=key, on_change="rerun")
+    for tab, render in zip(tabs, renderers.values()):
+        if tab.open:
+            with tab:
+                render(*args)
+
+# Most recent data entries shown per HDD in the viewers
+DATA_ENTRY_LIMIT = 20
+
+def get_data_entries(c, hdd_id: int, limit: int = DATA_ENTRY_LIMIT):
+    """Fetch data_entries rows for an HDD, newest first (limit=-1 for all)"""
+    return c.execute("""
+        SELECT author, ts, premise, date_search, date_seized, details
+        FROM data_entries WHERE hdd_id=? ORDER BY id DESC LIMIT ?
+    """, (hdd_id, limit)).fetchall()
+
+def format_data_entry(entry) -> str:
+    """Render a data_entries row in the same layout as the legacy data_details log"""
+    return (f"[DATA ENTRY {entry['ts']} by {entry['author']}]:\nPremise: {entry['premise']}\n"
+            f"Search Date: {entry['date_search']}\nSeized Date: {entry['date_seized']}\n\n"
+            f"Data Details:\n{entry['details']}")
+
+# Most recent audit events shown per HDD in the viewers
+AUDIT_LIMIT = 20
+
+# hdd_audit actions and the headings they had as notes appended to data_details
+AUDIT_HEADINGS = {'assign_subuser': 'ASSIGNED TO SUBUSER', 'seal': 'SEALED'}
+
+def get_hdd_audit(c, serial_no: str, limit: int = AUDIT_LIMIT):
+    """Fetch hdd_audit rows for an HDD, newest first (limit=-1 for all)"""
+    return c.execute("""
+        SELECT action, actor, target, ts, notes
+        FROM hdd_audit WHERE serial_no=? ORDER BY ts DESC, id DESC LIMIT ?
+    """, (serial_no, limit)).fetchall()
+
+def format_audit_entry(event) -> str:
+    """Render an hdd_audit row in the legacy '[ACTION ts by actor]: notes' layout"""
+    heading = AUDIT_HEADINGS.get(event['action'], str(event['action']).upper())
+    target = f" to {event['target']}" if event['target'] else ""
+    return f"[{heading} {event['ts']} by {event['actor']}{target}]: {event['notes'] or ''}"
+
+def format_data_details(entries, legacy: str = None, audit=()) -> str:
+    """Combine data entries, any notes still held in hdd_records.data_details and audit events"""
+    parts = [format_data_entry(e) for e in entries]
+    if isinstance(legacy, str) and legacy.strip():
+        parts.append(legacy.strip())
+    if audit:
+        parts.append("\n".join(format_audit_entry(a) for a in audit))
+    return "\n\n".join(parts)
+
+# Stay under SQLite's default limit of 999 bound parameters per statement
+IN_BATCH_SIZE = 900
+
+def group_in_batches(c, query, key, values):
+    """Run query once per batch of values bound to its {placeholders} IN list, grouping rows by key"""
+    values = list(values)
+    groups = {}
+    for i in range(0, len(values), IN_BATCH_SIZE):
+        batch = values[i:i + IN_BATCH_SIZE]
+        for row in c.execute(query.format(placeholders=",".join("?" * len(batch))), batch):
+            groups.setdefault(row[key], []).append(row)
+    return groups
+
+def get_full_data_details(c, records) -> dict:
+    """Complete details for hdd_records rows as {id: text}: every data entry, the legacy notes and audit history"""
+    entries = group_in_batches(c, """
+        SELECT hdd_id, author, ts, premise, date_search, date_seized, details
+        FROM data_entries WHERE hdd_id IN ({placeholders}) ORDER BY id DESC
+    """, 'hdd_id', {r['id'] for r in records})
+    audit = group_in_batches(c, """
+        SELECT serial_no, action, actor, target, ts, notes
+        FROM hdd_audit WHERE serial_no IN ({placeholders}) ORDER BY ts DESC, id DESC
+    """, 'serial_no', {r['serial_no'] for r in records})
+    return {r['id']: format_data_details(entries.get(r['id'], ()), r['data_details'], audit.get(r['serial_no'], ()))
+            for r in records}
 
 def ensure_default_admin():
-    conn = get_conn(); c = conn.cursor()
-    row = c.execute('SELECT * FROM users WHERE username=?', ('admin',)).fetchone()
-    if not row:
-        pw_hash = hash_password('admin123')
-        c.execute('INSERT INTO users(username, password_hash, role, approved) VALUES (?,?,?,1)', ('admin', pw_hash, 'admin'))
-        conn.commit()
-    conn.close()
+    with pooled_conn() as conn:
+        row = conn.execute('SELECT 1 FROM users WHERE username=?', ('admin',)).fetchone()
+        if not row:
+            pw_hash = hash_password('admin123')
+            conn.execute('INSERT INTO users(username, password_hash, role, approved) VALUES (?,?,?,1)', ('admin', pw_hash, 'admin'))
+            conn.commit()
 
 def fix_selectbox_color():
     st.markdown("""